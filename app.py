@@ -3,7 +3,7 @@ from fastapi.responses import JSONResponse
 from pydantic import BaseModel
 from retrieval import get_retriever, get_source_info
 from generation import get_answer_chain
-from query_processing import extract_medical_entities, expand_query
+from query_processing import extract_medical_entities, expand_query, entity_cache, get_ner_pipeline
 from fastapi.middleware.cors import CORSMiddleware
 import traceback
 import sys
@@ -37,11 +37,14 @@ async def global_exception_handler(request: Request, exc: Exception):
         content={"error": error_msg, "traceback": traceback_str},
     )
 
-# Initialize the document retriever and answer generation chain
+# Initialize the document retriever, answer generation chain and NER model
+# at import time, so a preloading server (see gunicorn.conf.py) loads them
+# once in the parent process and shares them with forked workers
 try:
     retriever = get_retriever()
     answer_chain = get_answer_chain()
-    print("Successfully initialized retriever and answer chain")
+    get_ner_pipeline()
+    print("Successfully initialized retriever, answer chain and NER model")
 except Exception as e:
     print(f"Error initializing components: {str(e)}")
     print(traceback.format_exc())
@@ -134,6 +137,15 @@ async def process_query(request: QueryRequest):
         print(traceback.format_exc())
         raise
 
+@app.get("/cache_stats")
+async def cache_stats():
+    """
+    Report hit/miss counts for the entity-extraction cache.
+    Counts are per worker process (see "pid"); with several workers each call
+    is answered by one of them.
+    """
+    return entity_cache.stats()
+
 @app.get("/")
 async def root():
     return {"message": "Medical Question Answering System API. Use /process_query endpoint to ask questions."}
\ No newline at end of file
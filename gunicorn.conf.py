@@ -0,0 +1,61 @@
+"""
+Gunicorn configuration for multi-worker deployment of the FastAPI backend.
+
+The app is imported once in the master process (preload_app), which loads the
+sentence-transformer, the biomedical NER model and the FAISS index before the
+workers are forked. Workers then share those read-only pages copy-on-write
+instead of each loading its own copy.
+
+Usage:
+    gunicorn app:app -c gunicorn.conf.py
+"""
+import gc
+import multiprocessing
+import os
+
+# Disable the collector in the master until fork, so collections during preload
+# do not leave free slots scattered across the pages the workers will share
+gc.disable()
+
+# Threads per worker for torch and FAISS (OpenMP): one per worker keeps N workers
+# from oversubscribing N cores
+TORCH_THREADS_PER_WORKER = int(os.getenv("TORCH_THREADS_PER_WORKER", "1"))
+
+# Must be set before torch/faiss are imported by the preloaded app
+os.environ.setdefault("OMP_NUM_THREADS", str(TORCH_THREADS_PER_WORKER))
+
+# Avoid the Hugging Face tokenizers thread pool deadlocking after fork
+os.environ.setdefault("TOKENIZERS_PARALLELISM", "false")
+
+# Server socket and workers
+bind = os.getenv("BIND", "0.0.0.0:8000")
+workers = int(os.getenv("WEB_CONCURRENCY", multiprocessing.cpu_count()))
+worker_class = "uvicorn_worker.UvicornWorker"
+timeout = int(os.getenv("WORKER_TIMEOUT", "120"))  # Answer generation can take a while
+
+# Load models and the index once in the master process before forking
+preload_app = True
+
+
+def when_ready(server):
+    """
+    Called in the master after the app is preloaded and before workers are forked.
+    Freeze all loaded objects into the permanent GC generation so garbage
+    collection in the workers does not touch (and copy) the shared pages.
+    """
+    gc.freeze()
+    server.log.info("Models preloaded; forking %s workers", workers)
+
+
+def post_fork(server, worker):
+    """
+    Called in each worker right after fork:
+    1. Re-enable garbage collection (frozen objects stay untouched)
+    2. Cap torch and FAISS threads
+    """
+    gc.enable()
+
+    import faiss
+    import torch
+    torch.set_num_threads(TORCH_THREADS_PER_WORKER)
+    faiss.omp_set_num_threads(TORCH_THREADS_PER_WORKER)
@@ -1,25 +1,267 @@
-from transformers import pipeline
+from collections import OrderedDict
+import hashlib
+import json
+import os
 import re
+import tempfile
+import threading
+import time
+
+# Biomedical NER model configuration
+NER_MODEL = "d4data/biomedical-ner-all"
+NER_MODEL_REVISION = os.getenv("NER_MODEL_REVISION", "main")  # Branch, tag or commit SHA
+
+# Entity cache configuration
+ENTITY_CACHE_SIZE = max(0, int(os.getenv("ENTITY_CACHE_SIZE", "1024")))  # Max queries kept in memory (0 disables)
+ENTITY_CACHE_DIR = os.getenv("ENTITY_CACHE_DIR")  # Optional shared disk tier (disabled if unset)
+ENTITY_CACHE_DISK_MAX_ENTRIES = max(0, int(os.getenv("ENTITY_CACHE_DISK_MAX_ENTRIES", "10000")))  # Max files on disk
+ENTITY_CACHE_DISK_PRUNE_RATIO = 0.9  # Pruning deletes down to this fraction of the cap
+ENTITY_CACHE_TMP_MAX_AGE = 60  # Seconds before an orphaned temp file is deleted
+
+# The NER pipeline is loaded once on first use and reused for every query
+_ner_pipeline = None
+_ner_lock = threading.Lock()
+
+
+def get_ner_pipeline():
+    """
+    Load the biomedical NER pipeline once and reuse it across queries
+    """
+    global _ner_pipeline
+    if _ner_pipeline is None:
+        with _ner_lock:
+            if _ner_pipeline is None:
+                # Imported here so the cache helpers can be used without loading transformers
+                from transformers import pipeline
+
+                # Initialize Named Entity Recognition pipeline with biomedical model
+                _ner_pipeline = pipeline(
+                    "ner",
+                    model=NER_MODEL,
+                    tokenizer=NER_MODEL,
+                    revision=NER_MODEL_REVISION,
+                    aggregation_strategy="simple",  # Combine subwords into single entities
+                    device=-1  # Use CPU (-1) or GPU (0)
+                )
+    return _ner_pipeline
+
+
+def get_ner_model_version():
+    """
+    Identify the exact NER model weights in use:
+    - A pinned commit SHA in NER_MODEL_REVISION is used as is
+    - Otherwise the commit the loaded model resolved to (branches like "main" move)
+    """
+    if re.fullmatch(r"[0-9a-f]{40}", NER_MODEL_REVISION):
+        return f"{NER_MODEL}@{NER_MODEL_REVISION}"
+
+    commit_hash = getattr(get_ner_pipeline().model.config, "_commit_hash", None)
+    return f"{NER_MODEL}@{commit_hash or NER_MODEL_REVISION}"
+
+
+def normalize_query(query):
+    """
+    Normalize query text for cache lookups, using only steps the uncased
+    NER tokenizer already applies so equal keys mean equal model input:
+    - Lowercase
+    - Collapse repeated whitespace
+    """
+    return re.sub(r"\s+", " ", query.lower()).strip()
+
+
+class EntityCache:
+    """
+    Bounded LRU cache for extracted entities with an optional local-disk tier.
+    Keys combine the normalized query text with the resolved NER model commit,
+    so a model upgrade never serves stale results.
+    """
+
+    def __init__(self, max_size=ENTITY_CACHE_SIZE, cache_dir=ENTITY_CACHE_DIR,
+                 disk_max_entries=ENTITY_CACHE_DISK_MAX_ENTRIES, model_version=None):
+        self.max_size = max(0, max_size)
+        self.cache_dir = cache_dir
+        self.disk_max_entries = max(0, disk_max_entries)
+        self._model_version = model_version  # Resolved from the loaded model on first use if None
+        self._disk_count = None  # Files on disk as of the last scan plus our writes since
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+
+        if self.cache_dir:
+            os.makedirs(self.cache_dir, exist_ok=True)
+
+    @property
+    def model_version(self):
+        if self._model_version is None:
+            self._model_version = get_ner_model_version()
+        return self._model_version
+
+    def make_key(self, query):
+        """Build a cache key from the model version and normalized query"""
+        raw = f"{self.model_version}\n{normalize_query(query)}"
+        return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+    def _disk_path(self, key):
+        return os.path.join(self.cache_dir, f"{key}.json")
+
+    def _remember(self, key, entities):
+        # Caller must hold self._lock
+        if self.max_size == 0:
+            return
+        self._entries[key] = entities
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+
+    def _scan_disk(self):
+        """List cache files and delete temp files orphaned by killed writers"""
+        files = []
+        now = time.time()
+        try:
+            entries = list(os.scandir(self.cache_dir))
+        except OSError:
+            return files
+        for entry in entries:
+            try:
+                if entry.name.endswith(".json"):
+                    files.append((entry.stat().st_mtime, entry.path))
+                elif entry.name.endswith(".tmp") and now - entry.stat().st_mtime > ENTITY_CACHE_TMP_MAX_AGE:
+                    os.remove(entry.path)
+            except OSError:
+                pass  # Removed or replaced by another process
+        return files
+
+    def _prune_disk(self):
+        """
+        Delete the least recently used cache files once the disk tier passes
+        disk_max_entries, down to ENTITY_CACHE_DISK_PRUNE_RATIO of the cap.
+        The directory is only scanned on first use and when pruning, so puts
+        under the cap stay cheap. Each process counts its own writes between
+        scans, so with several workers the tier can briefly exceed the cap.
+        """
+        if self._disk_count is None:
+            self._disk_count = len(self._scan_disk())
+        if self._disk_count <= self.disk_max_entries:
+            return
+
+        files = sorted(self._scan_disk())
+        low_water = int(self.disk_max_entries * ENTITY_CACHE_DISK_PRUNE_RATIO)
+        excess = max(0, len(files) - low_water)
+        for _, path in files[:excess]:
+            try:
+                os.remove(path)
+            except OSError:
+                pass  # Already removed by another process
+        self._disk_count = len(files) - excess
+
+    def get(self, query):
+        """Return cached entities for the query, or None on a miss"""
+        key = self.make_key(query)
+        with self._lock:
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return self._entries[key]
+
+        # Fall back to the shared disk tier if configured
+        if self.cache_dir:
+            path = self._disk_path(key)
+            try:
+                with open(path, "r", encoding="utf-8") as f:
+                    entities = json.load(f)
+            except (OSError, ValueError):
+                entities = None
+
+            if entities is not None:
+                try:
+                    os.utime(path)  # Mark as recently used for pruning
+                except OSError:
+                    pass  # Pruned by another process after the read
+                with self._lock:
+                    self._remember(key, entities)
+                    self.disk_hits += 1
+                return entities
+
+        with self._lock:
+            self.misses += 1
+        return None
+
+    def put(self, query, entities):
+        """Store entities for the query in memory and, if enabled, on disk"""
+        key = self.make_key(query)
+        with self._lock:
+            self._remember(key, entities)
+
+        if self.cache_dir and self.disk_max_entries > 0:
+            # Write to a temp file and rename so concurrent readers never see partial JSON
+            tmp_path = None
+            path = self._disk_path(key)
+            try:
+                is_new = not os.path.exists(path)
+                fd, tmp_path = tempfile.mkstemp(dir=self.cache_dir, suffix=".tmp")
+                with os.fdopen(fd, "w", encoding="utf-8") as f:
+                    json.dump(entities, f)
+                os.replace(tmp_path, path)
+                tmp_path = None
+                if is_new and self._disk_count is not None:
+                    self._disk_count += 1
+            except (OSError, TypeError, ValueError) as e:
+                print(f"Error writing entity cache file: {str(e)}")
+            finally:
+                if tmp_path is not None:
+                    try:
+                        os.remove(tmp_path)
+                    except OSError:
+                        pass
+            self._prune_disk()
+
+    def clear(self):
+        """Clear the in-memory tier and reset statistics"""
+        with self._lock:
+            self._entries.clear()
+            self.hits = self.disk_hits = self.misses = 0
+
+    def stats(self):
+        """
+        Return hit/miss counts for monitoring.
+        Counts are kept per process; under multiple workers each reports its own.
+        """
+        with self._lock:
+            lookups = self.hits + self.disk_hits + self.misses
+            return {
+                "pid": os.getpid(),
+                "hits": self.hits,
+                "disk_hits": self.disk_hits,
+                "misses": self.misses,
+                "hit_rate": (self.hits + self.disk_hits) / lookups if lookups else 0.0,
+                "size": len(self._entries),
+                "max_size": self.max_size,
+                "disk_tier": bool(self.cache_dir),
+                "disk_max_entries": self.disk_max_entries,
+                "model_version": self._model_version
+            }
+
+
+# Shared cache instance used by extract_medical_entities
+entity_cache = EntityCache()
+
 
 def extract_medical_entities(query):
     """
     Extract medical entities from the query text:
-    1. Initialize biomedical NER model
-    2. Process the query with specialized entity recognition
+    1. Return cached entities if this query was seen before
+    2. Process the query with the biomedical NER model
     3. Format the results with improved type mapping
     """
-    # Initialize Named Entity Recognition pipeline with biomedical model
-    ner_pipeline = pipeline(
-        "ner", 
-        model="d4data/biomedical-ner-all",
-        tokenizer="d4data/biomedical-ner-all",
-        aggregation_strategy="simple",  # Combine subwords into single entities
-        device=-1  # Use CPU (-1) or GPU (0)
-    )
-    
+    cached = entity_cache.get(query)
+    if cached is not None:
+        return [dict(e) for e in cached]
+
     # Process the query and extract biomedical entities
-    entities = ner_pipeline(query)
-    
+    entities = get_ner_pipeline()(query)
+
     # Map entity types to more readable formats
     entity_type_map = {
         "DISEASE": "Disease",
@@ -32,16 +274,19 @@ def extract_medical_entities(query):
         "RNA": "RNA",
         "PROTEIN": "Protein"
     }
-    
+
     # Format the results with improved type readability
-    return [
+    result = [
         {
             "word": e["word"],
             "type": entity_type_map.get(e["entity_group"], e["entity_group"])
-        } 
+        }
         for e in entities
     ]
 
+    entity_cache.put(query, result)
+    return [dict(e) for e in result]
+
 def expand_query(query, entities):
     """
     Use detected entities to expand the query for better retrieval.
@@ -0,0 +1,134 @@
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import query_processing
+from query_processing import EntityCache, normalize_query
+
+
+class FakeNerPipeline:
+    """Stand-in for the transformers NER pipeline that counts calls"""
+
+    def __init__(self):
+        self.calls = 0
+
+    def __call__(self, query):
+        self.calls += 1
+        return [{"word": "diabetes", "entity_group": "DISEASE"}]
+
+
+@pytest.fixture
+def fake_ner(monkeypatch):
+    ner = FakeNerPipeline()
+    monkeypatch.setattr(query_processing, "get_ner_pipeline", lambda: ner)
+    return ner
+
+
+def test_normalize_query():
+    assert normalize_query("  What is\tDIABETES?\n") == "what is diabetes?"
+
+
+def test_differently_folded_inputs_get_different_keys():
+    # The uncased tokenizer does not apply compatibility folding, so neither may the cache
+    cache = EntityCache(cache_dir=None, model_version="test")
+    assert cache.make_key("ﬁbrosis") != cache.make_key("fibrosis")
+    assert cache.make_key("Ｈ２Ｏ") != cache.make_key("h2o")
+
+
+def test_lru_eviction_order():
+    cache = EntityCache(max_size=2, cache_dir=None, model_version="test")
+    cache.put("a", [1])
+    cache.put("b", [2])
+    assert cache.get("a") == [1]  # "a" becomes most recently used
+    cache.put("c", [3])
+
+    assert cache.get("b") is None
+    assert cache.get("a") == [1]
+    assert cache.get("c") == [3]
+
+
+def test_non_positive_size_disables_memory_tier():
+    cache = EntityCache(max_size=-1, cache_dir=None, model_version="test")
+    cache.put("a", [1])
+    assert cache.get("a") is None
+    assert cache.stats()["size"] == 0
+
+
+def test_model_version_is_part_of_key():
+    old = EntityCache(cache_dir=None, model_version="model@1")
+    new = EntityCache(cache_dir=None, model_version="model@2")
+    assert old.make_key("q") != new.make_key("q")
+
+
+def test_disk_tier_round_trip(tmp_path):
+    writer = EntityCache(cache_dir=str(tmp_path), model_version="test")
+    writer.put("What is diabetes?", [{"word": "diabetes", "type": "Disease"}])
+
+    reader = EntityCache(cache_dir=str(tmp_path), model_version="test")
+    assert reader.get("what is  diabetes?") == [{"word": "diabetes", "type": "Disease"}]
+    assert reader.stats()["disk_hits"] == 1
+    assert not list(tmp_path.glob("*.tmp"))
+
+
+def test_disk_tier_is_pruned(tmp_path):
+    cache = EntityCache(cache_dir=str(tmp_path), disk_max_entries=4, model_version="test")
+    for i, query in enumerate(["a", "b", "c", "d", "e"]):
+        cache.put(query, [])
+        os.utime(cache._disk_path(cache.make_key(query)), (i, i))
+
+    # Passing the cap of 4 prunes the oldest files down to 90% of the cap
+    assert len(list(tmp_path.glob("*.json"))) == 3
+    for query in ["a", "b"]:
+        assert not os.path.exists(cache._disk_path(cache.make_key(query)))
+
+
+def test_put_under_cap_does_not_rescan(tmp_path, monkeypatch):
+    cache = EntityCache(cache_dir=str(tmp_path), disk_max_entries=100, model_version="test")
+    cache.put("first", [])
+
+    scans = []
+    real_scandir = os.scandir
+    monkeypatch.setattr(query_processing.os, "scandir", lambda path: scans.append(path) or real_scandir(path))
+    for i in range(10):
+        cache.put(f"query {i}", [])
+
+    assert scans == []
+    assert len(list(tmp_path.glob("*.json"))) == 11
+
+
+def test_prune_removes_stale_temp_files(tmp_path):
+    stale = tmp_path / "orphan.tmp"
+    fresh = tmp_path / "writing.tmp"
+    stale.write_text("{")
+    fresh.write_text("{")
+    os.utime(stale, (0, 0))
+
+    cache = EntityCache(cache_dir=str(tmp_path), disk_max_entries=1, model_version="test")
+    cache.put("a", [])
+    cache.put("b", [])
+
+    assert not stale.exists()
+    assert fresh.exists()
+
+
+def test_unserializable_entities_leave_no_temp_file(tmp_path):
+    cache = EntityCache(cache_dir=str(tmp_path), model_version="test")
+    cache.put("q", [object()])
+    assert not list(tmp_path.iterdir())
+
+
+def test_extract_uses_cache(monkeypatch, fake_ner):
+    cache = EntityCache(cache_dir=None, model_version="test")
+    monkeypatch.setattr(query_processing, "entity_cache", cache)
+
+    first = query_processing.extract_medical_entities("What is diabetes?")
+    second = query_processing.extract_medical_entities("what is DIABETES?")
+
+    assert first == second == [{"word": "diabetes", "type": "Disease"}]
+    assert fake_ner.calls == 1
+    stats = cache.stats()
+    assert (stats["hits"], stats["misses"]) == (1, 1)
+    assert stats["pid"] == os.getpid()